@@ -865,38 +865,35 @@ def get_author_reviewer_connections() -> list:
                 p.country,
                 p.advisor_id,
                 p.research_group_name,
-                pra.status as assignment_status
+                pra.status as assignment_status,
+                paf.affiliation_name,
+                paf.company_name,
+                paf.bachelor_name,
+                paf.master_name,
+                paf.phd_name,
+                adv.first_name || ' ' || adv.last_name as reviewer_advisor_name,
+                ai1.name as author_affiliation_name,
+                ac.company_name as author_workplace_name,
+                ai2.name as author_bachelor_name,
+                ai3.name as author_master_name,
+                ai4.name as author_phd_name
             FROM PaperReviewerAssignments pra
             JOIN ReviewSubmissions rs ON pra.submission_id = rs.submission_id
             JOIN Persons p ON pra.reviewer_person_id = p.person_id
+            LEFT JOIN PersonAffiliations_Flat paf ON p.person_id = paf.person_id
+            LEFT JOIN Persons adv ON p.advisor_id = adv.person_id
+            -- Authors have no Persons row, so their names are joined from the submission's own ids
+            LEFT JOIN Institutions ai1 ON rs.author_affiliation_id = ai1.institution_id
+            LEFT JOIN Companies ac ON rs.author_workplace_id = ac.company_id
+            LEFT JOIN Institutions ai2 ON rs.author_bachelor_institution_id = ai2.institution_id
+            LEFT JOIN Institutions ai3 ON rs.author_master_institution_id = ai3.institution_id
+            LEFT JOIN Institutions ai4 ON rs.author_phd_institution_id = ai4.institution_id
             ORDER BY pra.assigned_date DESC
         """)
 
         rows = cursor.fetchall()
         connections = []
 
-        # Get institution names for better display
-        def get_institution_name(inst_id):
-            if not inst_id:
-                return None
-            cursor.execute("SELECT name FROM Institutions WHERE institution_id = ?", (inst_id,))
-            row = cursor.fetchone()
-            return row[0] if row else None
-
-        def get_company_name(comp_id):
-            if not comp_id:
-                return None
-            cursor.execute("SELECT company_name FROM Companies WHERE company_id = ?", (comp_id,))
-            row = cursor.fetchone()
-            return row[0] if row else None
-
-        def get_advisor_name(advisor_id):
-            if not advisor_id:
-                return None
-            cursor.execute("SELECT first_name || ' ' || last_name FROM Persons WHERE person_id = ?", (advisor_id,))
-            row = cursor.fetchone()
-            return row[0] if row else None
-
         for row in rows:
             (submission_id, title, author_name,
              author_aff, author_work, author_bach, author_mast, author_phd,
@@ -904,7 +901,10 @@ def get_author_reviewer_connections() -> list:
              reviewer_id, reviewer_name, reviewer_email,
              rev_aff, rev_work, rev_bach, rev_mast, rev_phd,
              rev_city, rev_state, rev_country, rev_advisor_id, rev_group,
-             assignment_status) = row
+             assignment_status,
+             rev_aff_name, rev_work_name, rev_bach_name, rev_mast_name, rev_phd_name,
+             rev_advisor_name,
+             author_aff_name, author_work_name, author_bach_name, author_mast_name, author_phd_name) = row
 
             # Calculate conflicts and build factor list
             factors = []
@@ -912,8 +912,6 @@ def get_author_reviewer_connections() -> list:
             max_conflicts = 10  # Total possible conflict factors
 
             # Affiliation
-            author_aff_name = get_institution_name(author_aff)
-            rev_aff_name = get_institution_name(rev_aff)
             is_conflict = author_aff and rev_aff and author_aff == rev_aff
             if is_conflict:
                 conflicts += 1
@@ -926,8 +924,6 @@ def get_author_reviewer_connections() -> list:
             })
 
             # Workplace
-            author_work_name = get_company_name(author_work)
-            rev_work_name = get_company_name(rev_work)
             is_conflict = author_work and rev_work and author_work == rev_work
             if is_conflict:
                 conflicts += 1
@@ -940,8 +936,6 @@ def get_author_reviewer_connections() -> list:
             })
 
             # Bachelor's Institution
-            author_bach_name = get_institution_name(author_bach)
-            rev_bach_name = get_institution_name(rev_bach)
             is_conflict = author_bach and rev_bach and author_bach == rev_bach
             if is_conflict:
                 conflicts += 1
@@ -954,8 +948,6 @@ def get_author_reviewer_connections() -> list:
             })
 
             # Master's Institution
-            author_mast_name = get_institution_name(author_mast)
-            rev_mast_name = get_institution_name(rev_mast)
             is_conflict = author_mast and rev_mast and author_mast == rev_mast
             if is_conflict:
                 conflicts += 1
@@ -968,8 +960,6 @@ def get_author_reviewer_connections() -> list:
             })
 
             # PhD Institution
-            author_phd_name = get_institution_name(author_phd)
-            rev_phd_name = get_institution_name(rev_phd)
             is_conflict = author_phd and rev_phd and author_phd == rev_phd
             if is_conflict:
                 conflicts += 1
@@ -1018,7 +1008,6 @@ def get_author_reviewer_connections() -> list:
             })
 
             # Advisor
-            rev_advisor_name = get_advisor_name(rev_advisor_id)
             is_conflict = author_advisor and rev_advisor_name and author_advisor.lower() in rev_advisor_name.lower()
             if is_conflict:
                 conflicts += 1
@@ -9,11 +9,116 @@ from pathlib import Path
 SCRIPT_DIR = Path(__file__).parent
 DB_PATH = SCRIPT_DIR / "reviewmatch.db"
 
-def create_enums_and_tables():
-    """Create all database tables with proper relationships"""
-    conn = sqlite3.connect(DB_PATH)
+# Persons joined with the names of all linked institutions and the workplace,
+# used to (re)populate PersonAffiliations_Flat
+PERSON_AFFILIATIONS_FLAT_SELECT = """
+    SELECT
+        p.person_id,
+        i1.name AS affiliation_name,
+        c.company_name AS company_name,
+        i2.name AS bachelor_name,
+        i3.name AS master_name,
+        i4.name AS phd_name
+    FROM Persons p
+    LEFT JOIN Institutions i1 ON p.affiliation_id = i1.institution_id
+    LEFT JOIN Companies c ON p.workplace_id = c.company_id
+    LEFT JOIN Institutions i2 ON p.bachelor_institution_id = i2.institution_id
+    LEFT JOIN Institutions i3 ON p.master_institution_id = i3.institution_id
+    LEFT JOIN Institutions i4 ON p.phd_institution_id = i4.institution_id
+"""
+
+# Secondary indexes, created once bulk loading has finished
+INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS idx_persons_email ON Persons(email);
+CREATE INDEX IF NOT EXISTS idx_persons_orcid ON Persons(orcid_id);
+CREATE INDEX IF NOT EXISTS idx_persons_workplace ON Persons(workplace_id);
+CREATE INDEX IF NOT EXISTS idx_persons_advisor ON Persons(advisor_id);
+CREATE INDEX IF NOT EXISTS idx_persons_city_state ON Persons(city, state);
+CREATE INDEX IF NOT EXISTS idx_publications_author ON Publications(author_id);
+CREATE INDEX IF NOT EXISTS idx_publications_year ON Publications(publication_year);
+CREATE INDEX IF NOT EXISTS idx_publications_topic ON Publications(topic);
+CREATE INDEX IF NOT EXISTS idx_conflicts_person_one ON Conflicts_Of_Interest(person_one_id);
+CREATE INDEX IF NOT EXISTS idx_conflicts_person_two ON Conflicts_Of_Interest(person_two_id);
+CREATE INDEX IF NOT EXISTS idx_coauthorships_person_one ON CoAuthorships(person_one_id);
+CREATE INDEX IF NOT EXISTS idx_coauthorships_person_two ON CoAuthorships(person_two_id);
+CREATE INDEX IF NOT EXISTS idx_grant_collaborations_person_one ON GrantCollaborations(person_one_id);
+CREATE INDEX IF NOT EXISTS idx_grant_collaborations_person_two ON GrantCollaborations(person_two_id);
+CREATE INDEX IF NOT EXISTS idx_conference_attendance_person_one ON ConferenceAttendance(person_one_id);
+CREATE INDEX IF NOT EXISTS idx_conference_attendance_person_two ON ConferenceAttendance(person_two_id);
+CREATE INDEX IF NOT EXISTS idx_users_email ON Users(email);
+CREATE INDEX IF NOT EXISTS idx_review_submissions_user ON ReviewSubmissions(user_id);
+-- Partial index over pending submissions only, for the reviewer auto-assignment scan;
+-- it replaces a plain status index, which matched too many rows to be selective
+DROP INDEX IF EXISTS idx_review_submissions_status;
+CREATE INDEX IF NOT EXISTS idx_review_submissions_pending ON ReviewSubmissions(submission_id)
+    WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_review_submissions_date ON ReviewSubmissions(submission_date);
+CREATE INDEX IF NOT EXISTS idx_paper_reviewer_assignments_submission ON PaperReviewerAssignments(submission_id);
+CREATE INDEX IF NOT EXISTS idx_paper_reviewer_assignments_reviewer ON PaperReviewerAssignments(reviewer_person_id);
+CREATE INDEX IF NOT EXISTS idx_paper_reviewer_assignments_status ON PaperReviewerAssignments(status);
+CREATE INDEX IF NOT EXISTS idx_reviews_submission ON Reviews(submission_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_reviewer ON Reviews(reviewer_person_id);
+"""
+
+# Triggers keeping PersonAffiliations_Flat in sync with its source tables, plus a backfill
+# for persons that existed before the triggers
+PERSON_AFFILIATIONS_FLAT_DDL = f"""
+CREATE TRIGGER IF NOT EXISTS trg_persons_flat_insert
+AFTER INSERT ON Persons
+BEGIN
+    INSERT OR REPLACE INTO PersonAffiliations_Flat
+    {PERSON_AFFILIATIONS_FLAT_SELECT}
+    WHERE p.person_id = NEW.person_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_persons_flat_update
+AFTER UPDATE OF affiliation_id, workplace_id, bachelor_institution_id,
+                master_institution_id, phd_institution_id ON Persons
+BEGIN
+    INSERT OR REPLACE INTO PersonAffiliations_Flat
+    {PERSON_AFFILIATIONS_FLAT_SELECT}
+    WHERE p.person_id = NEW.person_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_persons_flat_delete
+AFTER DELETE ON Persons
+BEGIN
+    DELETE FROM PersonAffiliations_Flat WHERE person_id = OLD.person_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_institutions_flat_update
+AFTER UPDATE OF name ON Institutions
+BEGIN
+    INSERT OR REPLACE INTO PersonAffiliations_Flat
+    {PERSON_AFFILIATIONS_FLAT_SELECT}
+    WHERE NEW.institution_id IN (p.affiliation_id, p.bachelor_institution_id,
+                                 p.master_institution_id, p.phd_institution_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_companies_flat_update
+AFTER UPDATE OF company_name ON Companies
+BEGIN
+    INSERT OR REPLACE INTO PersonAffiliations_Flat
+    {PERSON_AFFILIATIONS_FLAT_SELECT}
+    WHERE p.workplace_id = NEW.company_id;
+END;
+
+INSERT OR REPLACE INTO PersonAffiliations_Flat {PERSON_AFFILIATIONS_FLAT_SELECT};
+"""
+
+
+def get_schema_connection():
+    """Get a connection in autocommit mode so schema transactions are explicit BEGIN/COMMIT"""
+    return sqlite3.connect(DB_PATH, isolation_level=None)
+
+def create_tables():
+    """Create all database tables with proper relationships (no secondary indexes)"""
+    conn = get_schema_connection()
     cursor = conn.cursor()
 
+    # One explicit transaction for every CREATE TABLE instead of per-statement autocommit
+    cursor.execute("BEGIN")
+
     # Note: SQLite doesn't have native ENUM support, so we'll use CHECK constraints
     # For PostgreSQL, you would use CREATE TYPE instead
 
@@ -285,36 +390,43 @@ def create_enums_and_tables():
         )
     """)
 
-    # Create indexes for better query performance
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_persons_email ON Persons(email)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_persons_orcid ON Persons(orcid_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_persons_workplace ON Persons(workplace_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_persons_advisor ON Persons(advisor_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_persons_city_state ON Persons(city, state)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_publications_author ON Publications(author_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_publications_year ON Publications(publication_year)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_publications_topic ON Publications(topic)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conflicts_person_one ON Conflicts_Of_Interest(person_one_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conflicts_person_two ON Conflicts_Of_Interest(person_two_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_coauthorships_person_one ON CoAuthorships(person_one_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_coauthorships_person_two ON CoAuthorships(person_two_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_grant_collaborations_person_one ON GrantCollaborations(person_one_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_grant_collaborations_person_two ON GrantCollaborations(person_two_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conference_attendance_person_one ON ConferenceAttendance(person_one_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conference_attendance_person_two ON ConferenceAttendance(person_two_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON Users(email)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_review_submissions_user ON ReviewSubmissions(user_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_review_submissions_status ON ReviewSubmissions(status)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_review_submissions_date ON ReviewSubmissions(submission_date)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_paper_reviewer_assignments_submission ON PaperReviewerAssignments(submission_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_paper_reviewer_assignments_reviewer ON PaperReviewerAssignments(reviewer_person_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_paper_reviewer_assignments_status ON PaperReviewerAssignments(status)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reviews_submission ON Reviews(submission_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reviews_reviewer ON Reviews(reviewer_person_id)")
-
-    conn.commit()
+    # 11. PersonAffiliations_Flat Table (materialized Persons -> Institutions/Companies names for COI checks)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS PersonAffiliations_Flat (
+            person_id INTEGER PRIMARY KEY,
+            affiliation_name TEXT,
+            company_name TEXT,
+            bachelor_name TEXT,
+            master_name TEXT,
+            phd_name TEXT,
+            FOREIGN KEY (person_id) REFERENCES Persons(person_id) ON DELETE CASCADE
+        )
+    """)
+
+    cursor.execute("COMMIT")
     conn.close()
-    print("✅ Database schema created successfully!")
+    print("✅ Database tables created successfully!")
+
+def create_indexes():
+    """Create indexes and derived-table triggers; run after bulk loading data"""
+    conn = get_schema_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Indexes, triggers and the flat-table backfill all commit together
+        cursor.executescript(f"BEGIN;\n{INDEX_DDL}\n{PERSON_AFFILIATIONS_FLAT_DDL}\nCOMMIT;")
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    print("✅ Database indexes created successfully!")
+
+def create_enums_and_tables():
+    """Create all database tables, then their indexes"""
+    create_tables()
+    create_indexes()
 
 if __name__ == "__main__":
     # Create database directory if it doesn't exist
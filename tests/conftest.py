@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The repo root (for `database`) and utils/ (the scripts import their siblings directly)
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / "utils"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from database import db_utils, schema  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / "reviewmatch.db"
+    monkeypatch.setattr(schema, "DB_PATH", path)
+    monkeypatch.setattr(db_utils, "DB_PATH", path)
+    schema.create_tables()
+    schema.create_indexes()
+    return path
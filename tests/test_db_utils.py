@@ -0,0 +1,40 @@
+import sqlite3
+
+from database import db_utils
+
+
+def test_author_reviewer_connections_resolve_names(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO Institutions (institution_id, name, type) VALUES (1, 'MIT', 'University')")
+    conn.execute("INSERT INTO Institutions (institution_id, name, type) VALUES (2, 'ETH', 'University')")
+    conn.execute("INSERT INTO Companies (company_id, company_name) VALUES (1, 'Acme')")
+    conn.execute("""
+        INSERT INTO Persons (person_id, first_name, last_name, email, role)
+        VALUES (1, 'Grace', 'Hopper', 'grace@example.org', 'Reviewer')
+    """)
+    conn.execute("""
+        INSERT INTO Persons (person_id, first_name, last_name, email, role,
+                             affiliation_id, workplace_id, advisor_id)
+        VALUES (2, 'Ada', 'Lovelace', 'ada@example.org', 'Reviewer', 1, 1, 1)
+    """)
+    conn.execute("INSERT INTO Users (user_id, email, password_hash, name) VALUES (1, 'u@example.org', 'x', 'U')")
+    conn.execute("""
+        INSERT INTO ReviewSubmissions (submission_id, user_id, title, author_name,
+                                       author_affiliation_id, author_workplace_id,
+                                       author_phd_institution_id, author_advisor_name)
+        VALUES (1, 1, 'A Paper', 'Alan Turing', 1, 1, 2, 'Hopper')
+    """)
+    conn.execute("INSERT INTO PaperReviewerAssignments (submission_id, reviewer_person_id) VALUES (1, 2)")
+    conn.commit()
+    conn.close()
+
+    [connection] = db_utils.get_author_reviewer_connections()
+    factors = {f["factor"]: f for f in connection["connection_factors"]}
+
+    assert (factors["Current Affiliation"]["authorValue"], factors["Current Affiliation"]["reviewerValue"]) == ("MIT", "MIT")
+    assert factors["Current Affiliation"]["isConflict"]
+    assert (factors["Workplace"]["authorValue"], factors["Workplace"]["reviewerValue"]) == ("Acme", "Acme")
+    assert factors["PhD Institution"]["authorValue"] == "ETH"
+    assert factors["Advisor"]["reviewerValue"] == "Grace Hopper"
+    assert factors["Advisor"]["isConflict"]
+    assert connection["degrees_of_separation"] == 3
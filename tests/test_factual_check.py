@@ -0,0 +1,133 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+import factual_check
+
+
+@pytest.mark.parametrize("text", [
+    "latency 5\u00a0ms",  # no-break space
+    "latency 5\u2009ms",  # thin space
+    "latency \uff15 ms",  # fullwidth digit
+    "latency 5 ms and 2.5 \u00b5s",
+])
+def test_corpus_and_query_extraction_agree(tmp_path, text):
+    path = tmp_path / "paper.txt"
+    path.write_text(text, encoding="utf-8")
+
+    cols = factual_check.extract_numeric_mentions(text)
+    expected = {}
+    for si_unit, value_si in zip(cols["si_unit"], cols["value_si"]):
+        expected.setdefault(f"number::{si_unit or None}", []).append(float(value_si))
+
+    corpus = {k: list(v) for k, v in factual_check.corpus_file_values(str(path)).items()}
+    assert corpus == expected
+    assert "number::second" in corpus
+
+
+@pytest.mark.parametrize("value, unit, expected", [
+    (3.0, "dB", 10 ** 0.3),
+    (20.0, "dBm", 0.1),
+    (25.0, "degC", 298.15),
+    (2.5, "km", 2500.0),
+])
+def test_bind_si_matches_pint(value, unit, expected):
+    si_unit, value_si = factual_check.bind_si(value, unit)
+    assert value_si == pytest.approx(expected)
+    assert value_si == pytest.approx(factual_check.Q_(value, unit).to_base_units().magnitude)
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """Write corpus text files plus a topic mapping; returns (mapping path, {name: path})."""
+    monkeypatch.setattr(factual_check, "STATS_CACHE_DIR", str(tmp_path / "stats"))
+
+    def write(files):
+        paths = {}
+        for name, text in files.items():
+            paths[name] = tmp_path / f"{name}.txt"
+            paths[name].write_text(text, encoding="utf-8")
+        mapping_path = tmp_path / "mapping.json"
+        mapping_path.write_text(json.dumps({name: {"text_path": str(p)} for name, p in paths.items()}))
+        return str(mapping_path), paths
+    return write
+
+
+def test_corpus_stats_aggregate_across_files(corpus):
+    mapping_path, _ = corpus({
+        "a": " ".join(f"{v} ms" for v in range(1, 7)),
+        "b": " ".join(f"{v} ms" for v in range(7, 13)) + " 3 kg",
+    })
+    stats = factual_check.build_corpus_stats_from_mapping(mapping_path)
+
+    expected = np.arange(1, 13) / 1000
+    assert set(stats) == {"number::second"}  # a bucket needs at least 10 values
+    assert stats["number::second"]["count"] == 12
+    assert stats["number::second"]["mean"] == pytest.approx(expected.mean())
+    assert stats["number::second"]["std"] == pytest.approx(expected.std())
+    assert stats["number::second"]["min"] == pytest.approx(0.001)
+    assert stats["number::second"]["max"] == pytest.approx(0.012)
+
+
+def test_only_changed_corpus_files_are_reextracted(corpus):
+    mapping_path, paths = corpus({
+        "a": " ".join(f"{v} ms" for v in range(1, 7)),
+        "b": " ".join(f"{v} ms" for v in range(7, 13)),
+    })
+    factual_check.build_corpus_stats_from_mapping(mapping_path)
+
+    # Plant marker values in a's per-file cache; they only show up if that entry is reused
+    a_cache = factual_check.file_values_cache_path(str(paths["a"]))
+    with open(a_cache, encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["values"] = {"number::second": [100.0] * 6}
+    with open(a_cache, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+
+    paths["b"].write_text(" ".join(f"{v} ms" for v in range(7, 14)), encoding="utf-8")
+    stats = factual_check.build_corpus_stats_from_mapping(mapping_path)
+
+    assert stats["number::second"]["count"] == 13  # b was re-read with its new value
+    assert stats["number::second"]["max"] == 100.0  # a came from its cache entry
+    # b's entry was overwritten in place rather than joined by a second one
+    assert len(os.listdir(os.path.dirname(a_cache))) == 2
+
+
+def test_columnar_checks_report_in_mention_order():
+    cols = factual_check.extract_numeric_mentions(
+        "accuracy 120 % and 150 % but 50 %; runs took 2 ms, 9 s and 4 kg, then 3 g"
+    )
+
+    assert factual_check.sanity_checks(cols) == ["Invalid percentage: 120.0%", "Invalid percentage: 150.0%"]
+    assert factual_check.internal_consistency_checks(cols) == [
+        "Inconsistent scale for second: min=0.002, max=9.0",
+        "Inconsistent scale for kilogram: min=0.003, max=4.0",
+    ]
+
+    stats = {
+        "number::kilogram": {"mean": 0.0035, "std": 0.001},
+        "number::second": {"mean": 0.002, "std": 0.001},
+    }
+    issues = factual_check.statistical_plausibility_checks(cols, stats)
+    assert [issue.split(" vs ")[0] for issue in issues] == ["Outlier 9.0 second", "Outlier 4.0 kilogram"]
+
+
+def test_mention_records_limit_and_nan():
+    cols = factual_check.extract_numeric_mentions("5 ms 3 parsecs 7 zorks")
+    records = factual_check.mention_records(cols)
+    assert len(records) == 3
+    assert records[0] == {"value": 5.0, "unit": "ms", "kind": "number", "si_unit": "second", "value_si": pytest.approx(0.005)}
+    assert records[2]["value_si"] is None and records[2]["si_unit"] is None
+    assert len(factual_check.mention_records(cols, limit=2)) == 2
+
+
+def test_stats_cache_is_overwritten_per_mapping(corpus, tmp_path):
+    mapping_path, paths = corpus({"a": " ".join(f"{v} ms" for v in range(1, 12))})
+    factual_check.build_corpus_stats_from_mapping(mapping_path)
+    paths["a"].write_text(" ".join(f"{v} ms" for v in range(1, 13)), encoding="utf-8")
+    stats = factual_check.build_corpus_stats_from_mapping(mapping_path)
+
+    assert stats["number::second"]["count"] == 12
+    assert len(list((tmp_path / "stats").glob("stats_*.json"))) == 1
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("sentence_transformers")
+
+import plagiarism_check as pc
+
+
+def words(start, stop):
+    return [f"w{i}" for i in range(start, stop)]
+
+
+def test_short_chunk_inside_long_one_is_full_containment():
+    short, long_ = words(0, 20), words(0, 200)
+    a, b = pc.shingles(short), pc.shingles(long_)
+    assert pc.calculate_exact_overlap(len(a & b), len(a), len(b)) == 1.0
+
+
+def test_overlap_below_threshold_is_dropped():
+    a, b = pc.shingles(words(0, 40)), pc.shingles(words(30, 70))
+    assert len(a & b) > 0
+    assert pc.calculate_exact_overlap(len(a & b), len(a), len(b)) is None
+
+
+def test_chunk_shorter_than_a_shingle_is_one_shingle():
+    assert pc.shingles(["only", "three", "words"]) == {hash(("only", "three", "words"))}
+
+
+def test_hits_are_ordered_by_test_then_reference_chunk():
+    test_shingles = [pc.shingles(words(0, 50)), pc.shingles(words(500, 550)), pc.shingles(words(100, 150))]
+    ref_shingles = [pc.shingles(words(100, 160)), pc.shingles(words(900, 950)), pc.shingles(words(0, 60))]
+    hits = pc.exact_overlap_hits(test_shingles, pc.shingle_postings(test_shingles), ref_shingles)
+    assert [(t, r) for t, r, _ in hits] == [(0, 2), (2, 0)]
+    assert all(score == 1.0 for _, _, score in hits)
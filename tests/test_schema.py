@@ -0,0 +1,60 @@
+import sqlite3
+
+from database import schema
+
+
+def query_plan(conn, sql):
+    return " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+def test_pending_submissions_use_partial_index(db_path):
+    conn = sqlite3.connect(db_path)
+    plan = query_plan(conn, """
+        SELECT rs.submission_id
+        FROM ReviewSubmissions rs
+        LEFT JOIN PaperReviewerAssignments pra ON rs.submission_id = pra.submission_id
+        WHERE rs.status = 'pending' AND pra.assignment_id IS NULL
+    """)
+    conn.close()
+    # Scanning the partial index only visits pending rows
+    assert "SCAN rs USING INDEX idx_review_submissions_pending" in plan
+
+
+def test_create_indexes_is_rerunnable(db_path):
+    schema.create_indexes()
+    conn = sqlite3.connect(db_path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert "idx_review_submissions_pending" in names
+    assert "idx_review_submissions_status" not in names
+    assert "idx_paper_reviewer_assignments_status" in names
+
+def flat_row(conn, person_id):
+    return conn.execute(
+        "SELECT affiliation_name, company_name, bachelor_name, master_name, phd_name"
+        " FROM PersonAffiliations_Flat WHERE person_id = ?", (person_id,)
+    ).fetchone()
+
+
+def test_flat_affiliations_follow_source_tables(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO Institutions (institution_id, name, type) VALUES (1, 'MIT', 'University')")
+    conn.execute("INSERT INTO Institutions (institution_id, name, type) VALUES (2, 'ETH', 'University')")
+    conn.execute("INSERT INTO Companies (company_id, company_name) VALUES (1, 'Acme')")
+    conn.execute("""
+        INSERT INTO Persons (person_id, first_name, last_name, email, role,
+                             affiliation_id, workplace_id, phd_institution_id)
+        VALUES (1, 'Ada', 'Lovelace', 'ada@example.org', 'Reviewer', 1, 1, 2)
+    """)
+    assert flat_row(conn, 1) == ("MIT", "Acme", None, None, "ETH")
+
+    conn.execute("UPDATE Persons SET bachelor_institution_id = 2 WHERE person_id = 1")
+    assert flat_row(conn, 1) == ("MIT", "Acme", "ETH", None, "ETH")
+
+    conn.execute("UPDATE Institutions SET name = 'ETH Zurich' WHERE institution_id = 2")
+    conn.execute("UPDATE Companies SET company_name = 'Acme Corp' WHERE company_id = 1")
+    assert flat_row(conn, 1) == ("MIT", "Acme Corp", "ETH Zurich", None, "ETH Zurich")
+
+    conn.execute("DELETE FROM Persons WHERE person_id = 1")
+    assert flat_row(conn, 1) is None
+    conn.close()
@@ -1,19 +1,26 @@
 import os
-import json
 import re
+import hashlib
 import argparse
 import numpy as np
+import orjson
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from PyPDF2 import PdfReader
+try:
+    from utils.embedder import set_torch_threads
+except ModuleNotFoundError:  # run as `python utils/<script>.py`, with utils/ itself on sys.path
+    from embedder import set_torch_threads
 
 # ---------------- CONFIG ----------------
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 PARSED_TEXT_DIR = "data/parsed_text"
 PAPERS_JSON = "data/metadata.json"
+CLAIMS_CACHE_DIR = "data/cache/claims"
+EMB_CACHE_DIR = "data/cache/emb"
 DEFAULT_CLAIM_SIM_THRESHOLD = 0.70
 MIN_SENT_LEN = 30
-CLAIM_KEYWORDS = [
+CLAIMS_CACHE_VERSION = 1  # bump when sentence splitting or claim selection changes
+CLAIM_KEYWORDS = (
     "we propose",
     "we present",
     "this paper",
@@ -26,24 +33,25 @@ CLAIM_KEYWORDS = [
     "we observe",
     "we develop",
     "we design",
-]
+)
 # ----------------------------------------
 
 
-def extract_text_from_pdf_fn(pdf_path):
-    text = ""
+def iter_pdf_sentences(pdf_path):
+    """Yield sentences page by page so the full PDF text is never held in memory."""
     try:
         reader = PdfReader(pdf_path)
         for page in reader.pages:
-            text += page.extract_text() or ""
+            page_text = page.extract_text() or ""
+            for s in split_into_sentences(page_text):
+                yield s
     except Exception as e:
         print(f"[WARN] Failed to parse PDF {pdf_path}: {e}")
-    return text.strip() if text else None
 
 
 def load_json(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
 
 
 def split_into_sentences(text):
@@ -55,33 +63,70 @@ def split_into_sentences(text):
 def extract_claims_by_keywords(sentences):
     claims = []
     for s in sentences:
-        if any(kw in s.lower() for kw in CLAIM_KEYWORDS):
+        lowered = s.lower()
+        if any(kw in lowered for kw in CLAIM_KEYWORDS):
             claims.append(s)
     return claims
 
 
-def extract_text_from_paper_meta(paper_meta, idx):
-    pdf_path = paper_meta.get("pdf_path") or paper_meta.get("pdf")
-    if pdf_path and os.path.exists(pdf_path):
-        try:
-            return extract_text_from_pdf_fn(pdf_path)
-        except Exception:
-            pass
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
 
-    txt_path = paper_meta.get("txt_path") or paper_meta.get("text_path")
-    if txt_path and os.path.exists(txt_path):
-        with open(txt_path, "r", encoding="utf-8") as f:
-            return f.read()
 
+def claims_cache_key(file_hash):
+    """Cache key for a file's claims: its hash plus the extraction settings, so changing either re-extracts."""
+    params = repr((CLAIMS_CACHE_VERSION, MIN_SENT_LEN, CLAIM_KEYWORDS))
+    return hashlib.sha256(f"{params}|{file_hash}".encode()).hexdigest()
+
+
+def paper_source_paths(paper_meta, idx):
+    pdf_path = paper_meta.get("pdf_path") or paper_meta.get("pdf")
+    txt_path = paper_meta.get("txt_path") or paper_meta.get("text_path")
     fallback = os.path.join(PARSED_TEXT_DIR, f"paper_{idx+1}.txt")
-    if os.path.exists(fallback):
-        with open(fallback, "r", encoding="utf-8") as f:
-            return f.read()
-    return None
+    return [p for p in (pdf_path, txt_path, fallback) if p and os.path.exists(p)]
+
+
+def extract_sentences_from_file(path):
+    if path.lower().endswith(".pdf"):
+        return list(iter_pdf_sentences(path))
+    with open(path, "r", encoding="utf-8") as f:
+        return split_into_sentences(f.read())
+
+
+def load_paper_claims(paper_meta, idx):
+    """
+    Return (claims, cache_key) for a paper. Claims are cached under
+    CLAIMS_CACHE_DIR keyed by the SHA-256 of the source file and the extraction
+    settings, so unchanged papers are never re-parsed.
+    """
+    for path in paper_source_paths(paper_meta, idx):
+        key = claims_cache_key(file_sha256(path))
+        cache_path = os.path.join(CLAIMS_CACHE_DIR, f"{key}.json")
+        if os.path.exists(cache_path):
+            return load_json(cache_path), key
+
+        sents = extract_sentences_from_file(path)
+        if not sents:
+            continue
+
+        claims = extract_claims_by_keywords(sents)
+        if not claims:
+            claims = sorted(sents, key=len, reverse=True)[:3]
+
+        os.makedirs(CLAIMS_CACHE_DIR, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            f.write(orjson.dumps(claims))
+        return claims, key
+    return [], None
 
 
 def gather_existing_claims(similar_list, papers_metadata):
     existing_claims = []
+    seen_keys = set()
     for entry in similar_list:
         meta = None
 
@@ -100,14 +145,10 @@ def gather_existing_claims(similar_list, papers_metadata):
         if not meta:
             continue
 
-        text = extract_text_from_paper_meta(meta, 0)
-        if not text:
+        claims, cache_key = load_paper_claims(meta, 0)
+        if cache_key in seen_keys:
             continue
-
-        sents = split_into_sentences(text)
-        claims = extract_claims_by_keywords(sents)
-        if not claims:
-            claims = sorted(sents, key=len, reverse=True)[:3]
+        seen_keys.add(cache_key)
 
         for c in claims:
             existing_claims.append(
@@ -115,6 +156,7 @@ def gather_existing_claims(similar_list, papers_metadata):
                     "paper_title": meta.get("title", ""),
                     "claim": c,
                     "link": meta.get("link", ""),
+                    "cache_key": cache_key,
                 }
             )
 
@@ -122,36 +164,77 @@ def gather_existing_claims(similar_list, papers_metadata):
 
 
 def extract_new_claims_from_new_pdf(new_pdf_path):
-    text = None
+    sents = []
     if os.path.exists(new_pdf_path):
-        try:
-            text = extract_text_from_pdf_fn(new_pdf_path)
-        except Exception:
-            text = None
+        sents = list(iter_pdf_sentences(new_pdf_path))
 
-    if not text:
+    if not sents:
         basename = os.path.splitext(os.path.basename(new_pdf_path))[0]
         alt = os.path.join(PARSED_TEXT_DIR, f"{basename}.txt")
         if os.path.exists(alt):
             with open(alt, "r", encoding="utf-8") as f:
-                text = f.read()
+                sents = split_into_sentences(f.read())
 
-    if not text:
+    if not sents:
         raise RuntimeError("Could not extract text for the new PDF.")
 
-    sents = split_into_sentences(text)
     new_claims = extract_claims_by_keywords(sents)
     if not new_claims:
         new_claims = sorted(sents, key=len, reverse=True)[:5]
-    return new_claims, text
+    return new_claims, sents
 
 
 def embed_texts(model, texts):
     return model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
 
 
+def normalize(vec: np.ndarray) -> np.ndarray:
+    return vec / np.linalg.norm(vec, axis=1, keepdims=True)
+
+
+def emb_cache_path(cache_key, model_name):
+    """Embedding cache file for a paper's claims; the model name is hashed in so encoders never share vectors."""
+    key = hashlib.sha256(f"{model_name}|{cache_key}".encode()).hexdigest()
+    return os.path.join(EMB_CACHE_DIR, f"{key}.npy")
+
+
+def embed_existing_claims(model, existing_claims, model_name=MODEL_NAME):
+    """
+    Embed existing claims paper by paper, reusing vectors cached under
+    EMB_CACHE_DIR (claims cache key plus model name) and encoding only misses.
+    """
+    groups = []
+    for c in existing_claims:
+        key = c.get("cache_key")
+        if groups and key is not None and groups[-1][0] == key:
+            groups[-1][1].append(c["claim"])
+        else:
+            groups.append((key, [c["claim"]]))
+
+    dim = model.get_sentence_embedding_dimension()
+    arrays = []
+    for key, texts in groups:
+        cache_path = emb_cache_path(key, model_name) if key else None
+        if cache_path and os.path.exists(cache_path):
+            emb = np.load(cache_path)
+            if emb.shape == (len(texts), dim):
+                arrays.append(emb)
+                continue
+
+        emb = embed_texts(model, texts)
+        if cache_path:
+            os.makedirs(EMB_CACHE_DIR, exist_ok=True)
+            np.save(cache_path, emb)
+        arrays.append(emb)
+    return np.concatenate(arrays)
+
+
 def map_claims(
-    new_claims, existing_claims, model, claim_threshold=DEFAULT_CLAIM_SIM_THRESHOLD
+    new_claims,
+    existing_claims,
+    model,
+    claim_threshold=DEFAULT_CLAIM_SIM_THRESHOLD,
+    model_name=MODEL_NAME,
 ):
     if not new_claims:
         return []
@@ -169,10 +252,10 @@ def map_claims(
         ]
 
     new_emb = embed_texts(model, new_claims)
-    existing_texts = [c["claim"] for c in existing_claims]
-    existing_emb = embed_texts(model, existing_texts)
+    existing_emb = embed_existing_claims(model, existing_claims, model_name)
 
-    sim_matrix = cosine_similarity(new_emb, existing_emb)
+    # Cosine similarity as one matmul over unit-length rows
+    sim_matrix = normalize(new_emb) @ normalize(existing_emb).T
     mappings = []
     for i, c in enumerate(new_claims):
         best_j = int(np.argmax(sim_matrix[i]))
@@ -233,7 +316,11 @@ def main():
 
     print("[STEP5] Mapping claims...")
     mappings = map_claims(
-        new_claims, existing_claims, model, claim_threshold=args.claim_threshold
+        new_claims,
+        existing_claims,
+        model,
+        claim_threshold=args.claim_threshold,
+        model_name=args.model,
     )
 
     # Use --out_dir if provided, else fallback to pdf name
@@ -246,18 +333,14 @@ def main():
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, "claim_mapping.json")
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "new_pdf": args.new_pdf,
-                "mappings": mappings,
-                "num_new_claims": len(new_claims),
-                "num_existing_claims": len(existing_claims),
-            },
-            f,
-            indent=2,
-            ensure_ascii=False,
-        )
+    payload = {
+        "new_pdf": args.new_pdf,
+        "mappings": mappings,
+        "num_new_claims": len(new_claims),
+        "num_existing_claims": len(existing_claims),
+    }
+    with open(out_path, "wb") as f:
+        f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
 
     print(f"[STEP5] Saved claim mapping to: {out_path}")
 
@@ -277,4 +360,5 @@ def main():
 
 
 if __name__ == "__main__":
+    set_torch_threads()
     main()
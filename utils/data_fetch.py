@@ -1,13 +1,21 @@
 import os
-import json
+import re
+import orjson
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
 import feedparser
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 from pathlib import Path
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+try:
+    from utils.embedder import load_embedder, set_torch_threads
+except ModuleNotFoundError:  # run as `python utils/<script>.py`, with utils/ itself on sys.path
+    from embedder import load_embedder, set_torch_threads
 
 # -------- Setup --------
 DATA_DIR = Path("data")
@@ -18,8 +26,71 @@ CACHE_DIR = DATA_DIR / "cache"
 for d in [TXT_DIR, PDF_DIR, INDEX_DIR, CACHE_DIR]:
     d.mkdir(parents=True, exist_ok=True)
 
-# Embedding model (for FAISS index)
-embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+
+# Embedding model (for FAISS index), loaded on first use so importing this module stays cheap
+_embedder = None
+
+
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        _embedder = load_embedder()
+    return _embedder
+
+
+# -------- Shared HTTP session --------
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Minimum seconds between requests to the same host. arXiv asks clients to pace both API
+# calls and PDF downloads, and Semantic Scholar's unauthenticated quota is about one request
+# per second. Other hosts are not paced.
+HOST_MIN_INTERVAL = {
+    "export.arxiv.org": 1.0,
+    "arxiv.org": 1.0,
+    "api.semanticscholar.org": 1.0,
+}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+_host_lock = threading.Lock()
+_host_next_at = {}
+
+
+def wait_for_host(url):
+    """Block until the host's minimum interval since its last request has passed."""
+    host = urlparse(url).hostname
+    interval = HOST_MIN_INTERVAL.get(host)
+    if not interval:
+        return
+    with _host_lock:
+        now = time.monotonic()
+        start = max(now, _host_next_at.get(host, 0.0))
+        _host_next_at[host] = start + interval
+    if start > now:
+        time.sleep(start - now)
+
+
+def get_with_backoff(url, params=None, retries=3, timeout=30):
+    """GET through the shared session at the host's pace, retrying throttling, 5xx and network errors."""
+    for attempt in range(retries + 1):
+        wait_for_host(url)
+        try:
+            resp = SESSION.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+            continue
+        if resp.status_code not in RETRY_STATUSES or attempt == retries:
+            break
+        retry_after = resp.headers.get("Retry-After", "")
+        time.sleep(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+
+    # Semantic Scholar reports its remaining quota; pause before it runs out
+    if resp.headers.get("x-ratelimit-remaining") == "0":
+        time.sleep(1)
+    return resp
 
 
 # -------- Fetch from ArXiv (paginated) --------
@@ -30,7 +101,7 @@ def fetch_arxiv(keyword, max_results=300):
 
     for start in range(0, max_results, per_page):
         query = f"search_query=all:{keyword}&start={start}&max_results={per_page}"
-        resp = requests.get(base_url + query)
+        resp = get_with_backoff(base_url + query)
         feed = feedparser.parse(resp.text)
 
         for entry in feed.entries:
@@ -44,7 +115,9 @@ def fetch_arxiv(keyword, max_results=300):
                 "pdf_url": pdf_link
             })
 
-        time.sleep(1)
+        # A short page means there are no more results
+        if len(feed.entries) < per_page:
+            break
 
     return results[:max_results]
 
@@ -62,10 +135,11 @@ def fetch_semantic_scholar(keyword, max_results=300):
             "limit": per_page,
             "fields": "title,abstract,url,openAccessPdf,publicationDate"
         }
-        resp = requests.get(url, params=params)
+        resp = get_with_backoff(url, params=params)
         data = resp.json()
 
-        for paper in data.get("data", []):
+        papers = data.get("data", [])
+        for paper in papers:
             pdf_url = paper.get("openAccessPdf", {}).get("url") if paper.get("openAccessPdf") else None
             results.append({
                 "title": paper.get("title", ""),
@@ -75,7 +149,8 @@ def fetch_semantic_scholar(keyword, max_results=300):
                 "pdf_url": pdf_url
             })
 
-        time.sleep(1)
+        if len(papers) < per_page:
+            break
 
     return results[:max_results]
 
@@ -88,7 +163,7 @@ def fetch_crossref(keyword, max_results=300):
 
     for offset in range(0, max_results, per_page):
         params = {"query": keyword, "rows": per_page, "offset": offset}
-        resp = requests.get(url, params=params)
+        resp = get_with_backoff(url, params=params)
         items = resp.json().get("message", {}).get("items", [])
 
         for item in items:
@@ -108,41 +183,61 @@ def fetch_crossref(keyword, max_results=300):
                 "pdf_url": pdf_url
             })
 
-        time.sleep(1)
+        if len(items) < per_page:
+            break
 
     return results[:max_results]
 
 
 # -------- Save TXT + PDF --------
+PDF_DOWNLOAD_WORKERS = 16
+
+
+def download_pdf(paper, pdf_path):
+    """Download one PDF; return its path, or None if it failed or wasn't a PDF."""
+    try:
+        wait_for_host(paper["pdf_url"])  # arXiv PDFs are paced even across download workers
+        with SESSION.get(paper["pdf_url"], timeout=15, stream=True) as pdf_resp:
+            if pdf_resp.status_code == 200 and "pdf" in pdf_resp.headers.get("Content-Type", "").lower():
+                # Stream to disk instead of holding the whole PDF in memory
+                with open(pdf_path, "wb") as pdf_file:
+                    for chunk in pdf_resp.iter_content(chunk_size=65536):
+                        pdf_file.write(chunk)
+                return pdf_path
+    except Exception as e:
+        print(f"[PDF Failed] {paper['title']} — {e}")
+    return None
+
+
 def save_papers(papers, topic):
     all_metadata = []
-    for idx, paper in enumerate(papers, start=1):
-        txt_path = TXT_DIR / f"{topic}_paper_{idx}.txt"
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write(f"Title: {paper['title']}\n")
-            f.write(f"Published: {paper['published']}\n")
-            f.write(f"Link: {paper['link']}\n\n")
-            f.write(f"Abstract:\n{paper['abstract']}\n")
-
-        pdf_path = None
-        if paper.get("pdf_url"):
-            try:
-                pdf_resp = requests.get(paper["pdf_url"], timeout=15)
-                if pdf_resp.status_code == 200 and "pdf" in pdf_resp.headers.get("Content-Type", "").lower():
-                    pdf_path = PDF_DIR / f"{topic}_paper_{idx}.pdf"
-                    with open(pdf_path, "wb") as pdf_file:
-                        pdf_file.write(pdf_resp.content)
-            except Exception as e:
-                print(f"[PDF Failed] {paper['title']} — {e}")
-
-        meta = paper.copy()
-        meta["txt_path"] = str(txt_path)
-        meta["pdf_path"] = str(pdf_path) if pdf_path else None
-        all_metadata.append(meta)
+    downloads = {}
+    with ThreadPoolExecutor(max_workers=PDF_DOWNLOAD_WORKERS) as executor:
+        for idx, paper in enumerate(papers, start=1):
+            txt_path = TXT_DIR / f"{topic}_paper_{idx}.txt"
+            with open(txt_path, "w", encoding="utf-8") as f:
+                f.write(f"Title: {paper['title']}\n")
+                f.write(f"Published: {paper['published']}\n")
+                f.write(f"Link: {paper['link']}\n\n")
+                f.write(f"Abstract:\n{paper['abstract']}\n")
+
+            # PDFs download in the background while the remaining TXT files are written
+            if paper.get("pdf_url"):
+                pdf_path = PDF_DIR / f"{topic}_paper_{idx}.pdf"
+                downloads[idx] = executor.submit(download_pdf, paper, pdf_path)
+
+            meta = paper.copy()
+            meta["txt_path"] = str(txt_path)
+            meta["pdf_path"] = None
+            all_metadata.append(meta)
+
+    for idx, future in downloads.items():
+        pdf_path = future.result()
+        if pdf_path:
+            all_metadata[idx - 1]["pdf_path"] = str(pdf_path)
 
     cache_path = CACHE_DIR / f"{topic}_papers.json"
-    with open(cache_path, "w", encoding="utf-8") as jf:
-        json.dump(all_metadata, jf, indent=4, ensure_ascii=False)
+    cache_path.write_bytes(orjson.dumps(all_metadata, option=orjson.OPT_INDENT_2))
 
     return all_metadata
 
@@ -150,11 +245,27 @@ def save_papers(papers, topic):
 # -------- Build FAISS index --------
 def build_faiss_index(papers, topic):
     texts = [p["title"] + " " + (p["abstract"] or "") for p in papers]
-    embeddings = embedder.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-    dim = embeddings.shape[1]
 
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
+    emb = get_embedder().encode(
+        texts,
+        batch_size=64,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=True,
+    ).astype("float32")
+    n, dim = emb.shape
+
+    # IVF with int8 scalar-quantized codes over inner product (cosine after normalization)
+    nlist = max(16, int(4 * np.sqrt(n)))
+    if n >= 39 * nlist:
+        index = faiss.index_factory(dim, f"IVF{nlist},SQ8", faiss.METRIC_INNER_PRODUCT)
+        index.train(emb)
+        index.add(emb)
+        index.nprobe = max(8, nlist // 16)
+    else:
+        # Too few vectors to train the coarse quantizer
+        index = faiss.IndexFlatIP(dim)
+        index.add(emb)
 
     faiss.write_index(index, str(INDEX_DIR / f"{topic}_index.faiss"))
     print(f"[INFO] Saved FAISS index for topic '{topic}'")
@@ -164,24 +275,32 @@ def build_faiss_index(papers, topic):
 def smart_fetch(topic, max_papers=15):
     cache_path = CACHE_DIR / f"{topic}_papers.json"
     if cache_path.exists():
-        with open(cache_path, "r", encoding="utf-8") as f:
-            cached = json.load(f)
+        cached = orjson.loads(cache_path.read_bytes())
         if len(cached) >= max_papers:
             print(f"[Cache Hit] Loaded {len(cached)} papers for {topic}")
             return cached[:max_papers]
 
     print(f"[Cache Miss] Fetching new papers for {topic}...")
 
-    papers = []
-    sources = [fetch_arxiv, fetch_semantic_scholar, fetch_crossref]
-
-    for src in sources:
-        needed = max_papers - len(papers)
+    # arXiv → Semantic Scholar → CrossRef: each lower-priority source is only asked for the shortfall
+    seen = {}
+    for src in [fetch_arxiv, fetch_semantic_scholar, fetch_crossref]:
+        needed = max_papers - len(seen)
         if needed <= 0:
             break
-        papers += src(topic, max_results=needed)
-
-    papers = papers[:max_papers]
+        try:
+            fetched = src(topic, max_results=needed)
+        except Exception as e:
+            print(f"[WARN] {src.__name__} failed: {e}")
+            continue
+
+        # The same paper often comes back from several sources; keep the first copy by title
+        for p in fetched:
+            key = re.sub(r"\W+", "", (p.get("title") or "").lower())[:120]
+            if key and key not in seen:
+                seen[key] = p
+
+    papers = list(seen.values())[:max_papers]
     saved = save_papers(papers, topic)
     build_faiss_index(saved, topic)
     return saved
@@ -206,6 +325,7 @@ def fetch_and_add_papers(topic, max_papers=15):
     return saved_meta
 
 if __name__ == "__main__":
+    set_torch_threads()
     parser = argparse.ArgumentParser(description="Smart Fetch Papers with Cache + FAISS")
     parser.add_argument("--keyword", type=str, required=True, help="Search keyword")
     args = parser.parse_args()
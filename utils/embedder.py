@@ -0,0 +1,59 @@
+"""
+Shared MiniLM loader for the indexing and checking scripts, so every stage
+embeds with the same model, backend and device choice.
+"""
+import os
+from sentence_transformers import SentenceTransformer
+
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# EMBEDDER_BACKEND=onnx encodes through ONNX Runtime; EMBEDDER_ONNX_FILE picks a quantized export,
+# e.g. onnx/model_qint8_avx512_vnni.onnx. Build the index and query it with the same backend.
+EMBEDDER_BACKEND = os.getenv("EMBEDDER_BACKEND", "torch")
+EMBEDDER_ONNX_FILE = os.getenv("EMBEDDER_ONNX_FILE")
+# EMBEDDER_FP16=1 runs the torch model in half precision on CUDA. Faster, but scores shift
+# slightly, so matches right at a threshold can flip; off by default.
+EMBEDDER_FP16 = os.getenv("EMBEDDER_FP16") == "1"
+
+
+def pick_device():
+    """Prefer CUDA, then Apple MPS, then CPU."""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+    except Exception:
+        pass
+    return "cpu"
+
+
+def set_torch_threads(n=None):
+    """
+    Size torch's CPU thread pool explicitly instead of trusting the OpenMP default (often 1 in
+    containers). TORCH_THREADS overrides; otherwise `n`, else every core.
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(int(os.getenv("TORCH_THREADS") or n or os.cpu_count() or 1))
+
+
+def load_embedder():
+    if EMBEDDER_BACKEND == "onnx":
+        model_kwargs = {"file_name": EMBEDDER_ONNX_FILE} if EMBEDDER_ONNX_FILE else None
+        return SentenceTransformer(EMBED_MODEL, backend="onnx", model_kwargs=model_kwargs)
+    device = pick_device()
+    model = SentenceTransformer(EMBED_MODEL, device=device)
+    if EMBEDDER_FP16 and device == "cuda":
+        model.half()
+    return model
+
+
+def embedder_signature(model):
+    """Identify what produced a vector: model, backend and, for torch, device type and dtype."""
+    if EMBEDDER_BACKEND == "onnx":
+        return f"{EMBED_MODEL}|onnx|{EMBEDDER_ONNX_FILE}"
+    dtype = next(model.parameters()).dtype
+    return f"{EMBED_MODEL}|torch|{model.device.type}|{dtype}"
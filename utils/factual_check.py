@@ -1,143 +1,316 @@
-import os, json, argparse
+import os, io, json, math, argparse, hashlib
+from multiprocessing import Pool
+from array import array
 from collections import defaultdict
-from statistics import mean, pstdev
+import numpy as np
 from PyPDF2 import PdfReader
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
 from pint import UnitRegistry
 import re
+import orjson
+from functools import lru_cache
 
 FAISS_DIR = "data/faiss_indexes"
+STATS_CACHE_DIR = "data/cache/corpus_stats"
 ureg = UnitRegistry()
 Q_ = ureg.Quantity
 
-def extract_numeric_mentions(text):
-    """Extract numeric values + units from text (very naive regex)."""
-    mentions = []
-    pattern = re.compile(r"([-+]?\d*\.?\d+)\s*([a-zA-Zµ%]*)")
-    for match in pattern.finditer(text):
+# Compiled once at import; shared by the query paper and corpus files so both sides extract alike.
+# The number alternatives can't overlap, so integer runs are never re-split by backtracking.
+NUM_UNIT_RE = re.compile(r"([-+]?(?:\d+(?:\.\d+)?|\.\d+))\s*([a-zA-Zµ%]*)")
+
+@lru_cache(maxsize=256)
+def _unit_info(unit):
+    """
+    Return (si_unit, scale, offset) so value_si = value * scale + offset, or None if pint can't convert.
+    scale and offset are None for logarithmic units (dB, dBm, Np), which need per-value conversion.
+    """
+    try:
+        q0 = Q_(0.0, unit).to_base_units()
+        q1 = Q_(1.0, unit).to_base_units()
+        q10 = Q_(10.0, unit).to_base_units()
+    except Exception:
+        return None
+    scale, offset = q1.magnitude - q0.magnitude, q0.magnitude
+    # Multiplicative and offset units (degC, degF) map affinely; a third point rules out log units
+    if not math.isclose(q10.magnitude, 10.0 * scale + offset, rel_tol=1e-9, abs_tol=1e-12):
+        return str(q1.units), None, None
+    return str(q1.units), scale, offset
+
+def bind_si(value, unit):
+    """Return (si_unit, value_si) for a value and its unit token; value_si is None if the unit is unknown."""
+    if not unit:
+        return None, value
+    info = _unit_info(unit)
+    if not info:
+        return None, None
+    si_unit, scale, offset = info
+    if scale is None:
+        return si_unit, Q_(value, unit).to_base_units().magnitude
+    return si_unit, value * scale + offset
+
+def iter_numeric_mentions(text):
+    """Yield (value, unit, si_unit, value_si) for each number in text (very naive regex)."""
+    for match in NUM_UNIT_RE.finditer(text):
         val, unit = match.groups()
         try:
             value = float(val)
         except:
             continue
-        mention = {
-            "value": value,
-            "unit": unit or None,
+        yield (value, unit) + bind_si(value, unit)
+
+def extract_numeric_mentions(text):
+    """Extract numeric values + units from text as parallel columns, binding SI units in the same pass."""
+    values, values_si = array("d"), array("d")
+    units, si_units = [], []
+    for value, unit, si_unit, value_si in iter_numeric_mentions(text):
+        values.append(value)
+        values_si.append(np.nan if value_si is None else value_si)
+        units.append(unit or "")
+        si_units.append(si_unit or "")
+    return {
+        "value": np.asarray(values, dtype=np.float64),
+        "value_si": np.asarray(values_si, dtype=np.float64),  # NaN where the unit couldn't be converted
+        "unit": np.array(units, dtype=object),
+        "si_unit": np.array(si_units, dtype=object),
+    }
+
+def mention_records(cols, limit=None):
+    """Materialize mention dicts for the JSON report; only the first `limit` are built."""
+    n = len(cols["value"]) if limit is None else min(limit, len(cols["value"]))
+    records = []
+    for i in range(n):
+        value_si = float(cols["value_si"][i])
+        records.append({
+            "value": float(cols["value"][i]),
+            "unit": cols["unit"][i] or None,
             "kind": "number",
-            "si_unit": None,
-            "value_si": None
-        }
-        mentions.append(mention)
-    return mentions
-
-def bind_metric_labels(mentions):
-    """Bind mentions to SI units using pint."""
-    for m in mentions:
-        if m["unit"]:
-            try:
-                q = Q_(m["value"], m["unit"]).to_base_units()
-                m["si_unit"] = str(q.units)
-                m["value_si"] = q.magnitude
-            except Exception:
-                m["si_unit"] = None
-                m["value_si"] = None
-        else:
-            m["si_unit"] = None
-            m["value_si"] = m["value"]
+            "si_unit": cols["si_unit"][i] or None,
+            "value_si": None if np.isnan(value_si) else value_si
+        })
+    return records
 
-def sanity_checks(mentions):
+def sanity_checks(cols):
     """Check for impossible values (e.g., negative percentages)."""
-    issues = []
-    for m in mentions:
-        if m["unit"] == "%" and (m["value"] < 0 or m["value"] > 100):
-            issues.append(f"Invalid percentage: {m['value']}%")
-    return issues
+    value = cols["value"]
+    bad = (cols["unit"] == "%") & ((value < 0) | (value > 100))
+    return [f"Invalid percentage: {float(v)}%" for v in value[bad]]
 
-def internal_consistency_checks(mentions):
+def internal_consistency_checks(cols):
     """Naive check: flag if same unit appears with wildly different scales."""
     issues = []
-    grouped = defaultdict(list)
-    for m in mentions:
-        if m["si_unit"] and m["value_si"] is not None:
-            grouped[m["si_unit"]].append(m["value_si"])
-    for unit, values in grouped.items():
-        if len(values) > 1 and max(values) > 1000 * min(values):
-            issues.append(f"Inconsistent scale for {unit}: min={min(values)}, max={max(values)}")
+    valid = (cols["si_unit"] != "") & ~np.isnan(cols["value_si"])
+    si_units = cols["si_unit"][valid]
+    values = cols["value_si"][valid]
+    units, first = np.unique(si_units, return_index=True)
+    for unit in units[np.argsort(first)]:  # report units in order of first appearance
+        vals = values[si_units == unit]
+        if vals.size < 2:
+            continue
+        mn, mx = float(vals.min()), float(vals.max())
+        if mx > 1000 * mn:
+            issues.append(f"Inconsistent scale for {unit}: min={mn}, max={mx}")
     return issues
 
-def statistical_plausibility_checks(mentions, stats, z_thresh=3.0):
+def statistical_plausibility_checks(cols, stats, z_thresh=3.0):
     """Check if values are statistical outliers compared to corpus stats."""
+    valid_idx = np.flatnonzero((cols["si_unit"] != "") & ~np.isnan(cols["value_si"]))
+    si_units = cols["si_unit"][valid_idx]
+
+    # Score each bucket in one vectorized pass, then report in mention order
+    flagged = []
+    for unit in np.unique(si_units):
+        key = f"number::{unit}"
+        if key not in stats:
+            continue
+        mu = stats[key]["mean"]
+        sigma = stats[key]["std"]
+        if sigma <= 0:
+            continue
+        idxs = valid_idx[si_units == unit]
+        z = (cols["value_si"][idxs] - mu) / sigma
+        for i in idxs[np.abs(z) > z_thresh]:
+            flagged.append((int(i), mu, sigma))
+
     issues = []
-    for m in mentions:
-        if m["si_unit"] and m["value_si"] is not None:
-            key = f"{m['kind']}::{m['si_unit']}"
-            if key in stats:
-                mu = stats[key]["mean"]
-                sigma = stats[key]["std"]
-                if sigma > 0 and abs(m["value_si"] - mu) > z_thresh * sigma:
-                    issues.append(f"Outlier {m['value_si']} {m['si_unit']} vs mean {mu}±{sigma}")
+    for i, mu, sigma in sorted(flagged, key=lambda f: f[0]):
+        issues.append(f"Outlier {float(cols['value_si'][i])} {cols['si_unit'][i]} vs mean {mu}±{sigma}")
     return issues
 
 # ---------------- Main factual check ----------------
 def extract_text_from_pdf(pdf_path, max_chars=20000):
+    """Extract text with PyMuPDF, falling back to PyPDF2 if it's missing or can't open the PDF."""
+    if fitz is not None:
+        try:
+            with fitz.open(pdf_path) as doc:
+                return take_chars((page.get_text("text") for page in doc), max_chars)
+        except Exception as e:
+            print(f"[WARN] PyMuPDF failed on {pdf_path}, falling back to PyPDF2: {e}")
     reader = PdfReader(pdf_path)
-    text = "".join(page.extract_text() or "" for page in reader.pages)
-    return text[:max_chars]
+    return take_chars((page.extract_text() or "" for page in reader.pages), max_chars)
+
+def take_chars(page_texts, max_chars):
+    """Join page texts lazily, stopping once max_chars is reached so later pages are never parsed."""
+    buf = io.StringIO()
+    for t in page_texts:
+        buf.write(t)
+        if buf.tell() >= max_chars:
+            break
+    return buf.getvalue()[:max_chars]
 
 def read_text(path: str) -> str:
     return extract_text_from_pdf(path) if path.lower().endswith(".pdf") else open(path, "r", encoding="utf-8").read()
 
+def stat_corpus_files(paths):
+    """Stat each existing file once, returning sorted (path, mtime_ns, size) tuples."""
+    file_stats = []
+    for p in sorted(set(paths)):
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        file_stats.append((p, st.st_mtime_ns, st.st_size))
+    return file_stats
+
+def corpus_signature(mapping_path, file_stats):
+    """Hash (path, mtime, size) of the mapping and every corpus file; changes whenever the corpus does."""
+    st = os.stat(mapping_path)
+    entries = [(mapping_path, st.st_mtime_ns, st.st_size)] + file_stats
+    return hashlib.blake2b(repr(entries).encode(), digest_size=16).hexdigest()
+
+def corpus_file_values(txt_path):
+    """Return {bucket key: array of SI values} for one corpus file."""
+    values = defaultdict(lambda: array("d"))
+    # Decode and scan with the same str pattern as the query paper: a bytes pattern's \s and \d
+    # are ASCII-only and would split NBSP/thin-space units off their numbers
+    with open(txt_path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    for _, _, si_unit, value_si in iter_numeric_mentions(text):
+        if value_si is not None:
+            values[f"number::{si_unit}"].append(float(value_si))
+    return dict(values)
+
+def _extract_one(item):
+    """Pool worker: stale-file tuple -> (tuple, values); packed arrays keep the result pickle small."""
+    return item, corpus_file_values(item[0])
+
+def extract_stale_files(stale):
+    """
+    Yield (stale-file tuple, values) as each file finishes. A single file is extracted in-process;
+    several go to a pool no larger than the number of files.
+    """
+    if len(stale) == 1:
+        yield _extract_one(stale[0])
+        return
+    with Pool(min(len(stale), os.cpu_count() or 1)) as pool:
+        yield from pool.imap_unordered(_extract_one, stale, chunksize=8)
+
+def file_values_cache_path(path):
+    """Per-file cache entry, one per path; it records mtime and size and is overwritten when they change."""
+    key = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=16).hexdigest()
+    return os.path.join(STATS_CACHE_DIR, "files", f"{key}.json")
+
+def load_file_values(file_cache, mtime_ns, size):
+    """Cached {bucket key: values} for a file, or None if missing or written for another mtime/size."""
+    if not os.path.exists(file_cache):
+        return None
+    with open(file_cache, "rb") as f:
+        entry = orjson.loads(f.read())
+    if entry.get("mtime_ns") != mtime_ns or entry.get("size") != size:
+        return None
+    return entry["values"]
+
+def save_file_values(file_cache, mtime_ns, size, values):
+    with open(file_cache, "wb") as f:
+        f.write(orjson.dumps({
+            "mtime_ns": mtime_ns,
+            "size": size,
+            "values": {key: vals.tolist() for key, vals in values.items()},
+        }))
+
 def build_corpus_stats_from_mapping(mapping_path: str) -> dict:
     if not os.path.exists(mapping_path):
         return {}
     with open(mapping_path, "r", encoding="utf-8") as f:
         mapping = json.load(f)
 
-    agg = defaultdict(list)
-    for entry in mapping.values():
-        txt_path = entry.get("text_path")
-        if not txt_path or not os.path.exists(txt_path):
+    file_stats = stat_corpus_files(
+        entry.get("text_path") for entry in mapping.values() if entry.get("text_path")
+    )
+
+    # Stats only depend on the corpus, so reuse them until any file changes. One cache file
+    # per mapping, overwritten when the corpus signature moves on.
+    sig = corpus_signature(mapping_path, file_stats)
+    mapping_key = hashlib.blake2b(os.path.abspath(mapping_path).encode(), digest_size=16).hexdigest()
+    cache_path = os.path.join(STATS_CACHE_DIR, f"stats_{mapping_key}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("signature") == sig:
+            return cached["stats"]
+
+    # Reuse per-file values for unchanged files and only re-extract stale ones.
+    # The stat above already tells us which files are empty; don't open those.
+    agg = defaultdict(lambda: array("d"))  # packed doubles, viewed as NumPy arrays without copying
+    stale = []
+    for p, mtime_ns, size in file_stats:
+        if size == 0:
             continue
-        text = open(txt_path, "r", encoding="utf-8").read()
-        mentions = extract_numeric_mentions(text)
-        bind_metric_labels(mentions)
-        for m in mentions:
-            if m["value_si"] is not None:
-                key = f"{m['kind']}::{m.get('si_unit')}"
-                agg[key].append(float(m["value_si"]))
+        file_cache = file_values_cache_path(p)
+        cached = load_file_values(file_cache, mtime_ns, size)
+        if cached is not None:
+            for key, vals in cached.items():
+                agg[key].extend(vals)
+        else:
+            stale.append((p, mtime_ns, size, file_cache))
+
+    if stale:
+        os.makedirs(os.path.join(STATS_CACHE_DIR, "files"), exist_ok=True)
+        for (_, mtime_ns, size, file_cache), values in extract_stale_files(stale):
+            save_file_values(file_cache, mtime_ns, size, values)
+            for key, vals in values.items():
+                agg[key].extend(vals)
 
     stats = {}
     for k, vals in agg.items():
         if len(vals) >= 10:
+            a = np.frombuffer(vals, dtype=np.float64)
             stats[k] = {
-                "count": len(vals),
-                "mean": float(mean(vals)),
-                "std": float(pstdev(vals)),
-                "min": float(min(vals)),
-                "max": float(max(vals))
+                "count": len(a),
+                "mean": float(a.mean()),
+                "std": float(a.std()),
+                "min": float(a.min()),
+                "max": float(a.max())
             }
+
+    os.makedirs(STATS_CACHE_DIR, exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({"signature": sig, "stats": stats}, f)
     return stats
 
 def factual_check(path: str, topic: str, z_thresh: float = 3.0):
     # Load text & mentions
     text = read_text(path)
-    mentions = extract_numeric_mentions(text)
-    bind_metric_labels(mentions)
+    cols = extract_numeric_mentions(text)
 
     # Sanity + internal checks
-    hard_issues = sanity_checks(mentions) + internal_consistency_checks(mentions)
+    hard_issues = sanity_checks(cols) + internal_consistency_checks(cols)
 
     # Stats from FAISS mapping
     mapping_path = os.path.join(FAISS_DIR, f"{topic}_mapping.json")
     stats = build_corpus_stats_from_mapping(mapping_path)
 
     # Statistical plausibility
-    stat_issues = statistical_plausibility_checks(mentions, stats, z_thresh)
+    stat_issues = statistical_plausibility_checks(cols, stats, z_thresh)
 
     return {
         "file": path,
         "topic": topic,
-        "num_mentions": len(mentions),
-        "mentions": mentions[:2000],
+        "num_mentions": len(cols["value"]),
+        "mentions": mention_records(cols, limit=2000),
         "issues": {
             "hard_checks": hard_issues,
             "statistical_checks": stat_issues
@@ -156,8 +329,8 @@ if __name__ == "__main__":
     results = factual_check(args.path, args.topic, args.z_thresh)
     if args.output:
         os.makedirs(os.path.dirname(args.output), exist_ok=True)
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        with open(args.output, "wb") as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
         print(f"Results saved to {args.output}")
     else:
-        print(json.dumps(results, indent=2, ensure_ascii=False))
+        print(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode("utf-8"))
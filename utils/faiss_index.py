@@ -1,14 +1,27 @@
 import os
 import json
+import hashlib
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from PyPDF2 import PdfReader
+try:
+    from utils.embedder import embedder_signature, load_embedder, set_torch_threads
+except ModuleNotFoundError:  # run as `python utils/<script>.py`, with utils/ itself on sys.path
+    from embedder import embedder_signature, load_embedder, set_torch_threads
 
 FAISS_DIR = "data/faiss_indexes"
 PDF_DIR = "data/pdfs"
 METADATA_PATH = "data/metadata.json"
+EMB_CACHE_DIR = "data/cache/emb/chunks"  # per-paper chunk vectors, keyed by content hash
+INDEX_MAX_CHARS = 20000  # text indexed per paper, split into chunks below
+CHUNK_TOKENS = 220  # MiniLM truncates at 256 word pieces
+CHUNK_OVERLAP = 40
+# Below this many chunks an exact scan is cheap, and PQ's 256-centroid codebooks need about
+# 10k training points anyway
+IVFPQ_MIN_VECTORS = 20000
+IVFPQ_REFINE_K_FACTOR = 4
 
 
 def extract_text_from_file(file_path, max_chars=2000):
@@ -16,10 +29,14 @@ def extract_text_from_file(file_path, max_chars=2000):
     try:
         if file_path.endswith(".pdf"):
             reader = PdfReader(file_path)
-            text = ""
-            for page in reader.pages[:5]:
-                text += page.extract_text() or ""
-            return text[:max_chars]
+            text_parts, total = [], 0
+            for page in reader.pages:
+                t = page.extract_text() or ""
+                text_parts.append(t)
+                total += len(t)
+                if total >= max_chars:
+                    break
+            return "".join(text_parts)[:max_chars]
         elif file_path.endswith(".txt"):
             with open(file_path, "r", encoding="utf-8") as f:
                 return f.read()[:max_chars]
@@ -29,8 +46,70 @@ def extract_text_from_file(file_path, max_chars=2000):
         return f"ERROR reading {file_path}: {e}"
 
 
-def normalize(vec: np.ndarray) -> np.ndarray:
-    return vec / np.linalg.norm(vec, axis=1, keepdims=True)
+def split_into_token_windows(tokenizer, text, size=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """Split text into overlapping windows of `size` tokens, sliced from the original text."""
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    if not offsets:
+        return [text] if text.strip() else []
+    chunks = []
+    for start in range(0, len(offsets), size - overlap):
+        window = offsets[start:start + size]
+        chunks.append(text[window[0][0]:window[-1][1]])
+        if start + size >= len(offsets):
+            break
+    return chunks
+
+
+def chunk_cache_key(chunks, signature):
+    """Hash of the exact chunk texts and the encoder (model, backend, device, dtype) that embeds them."""
+    h = hashlib.sha256(signature.encode())
+    for chunk in chunks:
+        h.update(b"\0")
+        h.update(chunk.encode("utf-8"))
+    return h.hexdigest()
+
+
+def embed_chunks(model, paper_chunks):
+    """
+    Embed each paper's chunks, reusing vectors cached under EMB_CACHE_DIR and
+    encoding all cache misses in one batched call.
+    """
+    dim = model.get_sentence_embedding_dimension()
+    signature = embedder_signature(model)
+    arrays, misses = [None] * len(paper_chunks), []
+    for i, chunks in enumerate(paper_chunks):
+        if not chunks:
+            arrays[i] = np.empty((0, dim), dtype=np.float32)
+            continue
+        cache_path = os.path.join(EMB_CACHE_DIR, f"{chunk_cache_key(chunks, signature)}.npy")
+        if os.path.exists(cache_path):
+            emb = np.load(cache_path)
+            if emb.shape == (len(chunks), dim):
+                arrays[i] = emb
+                continue
+        misses.append((i, cache_path))
+
+    if misses:
+        texts = [c for i, _ in misses for c in paper_chunks[i]]
+        # Boilerplate (licences, acknowledgements) repeats across papers; encode each distinct chunk once
+        unique_idx = {}
+        rows = [unique_idx.setdefault(t, len(unique_idx)) for t in texts]
+        print(
+            f"[INFO] Encoding {len(unique_idx)} distinct chunks "
+            f"({len(texts)} total) from {len(misses)} uncached documents"
+        )
+        # Unit vectors so inner product = cosine
+        vectors = model.encode(
+            list(unique_idx), batch_size=64, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)[rows]
+        os.makedirs(EMB_CACHE_DIR, exist_ok=True)
+        offset = 0
+        for i, cache_path in misses:
+            emb = vectors[offset:offset + len(paper_chunks[i])]
+            offset += len(emb)
+            np.save(cache_path, emb)
+            arrays[i] = emb
+    return np.concatenate(arrays)
 
 
 def build_faiss_index(pdf_dir, index_path, mapping_path, metadata_path=None):
@@ -51,42 +130,68 @@ def build_faiss_index(pdf_dir, index_path, mapping_path, metadata_path=None):
                 if pdf_path:
                     metadata_dict[os.path.basename(pdf_path)] = raw_meta
 
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-    vectors, mapping = [], {}
-    idx = 0
-
-    for fname in os.listdir(pdf_dir):
-        if not (fname.endswith(".pdf") or fname.endswith(".txt")):
-            continue
-        file_path = os.path.join(pdf_dir, fname)
-        text_excerpt = extract_text_from_file(file_path)
-
-        # Embed
-        vec = model.encode([text_excerpt], convert_to_numpy=True)
-        vec = normalize(vec)
-        vectors.append(vec)
-
+    with os.scandir(pdf_dir) as it:
+        entries = [e for e in it if e.name.endswith((".pdf", ".txt")) and e.is_file()]
+    fnames = [e.name for e in entries]
+    file_paths = [e.path for e in entries]
+
+    # PyPDF2 parsing is CPU-bound pure Python, so extract on one process per core
+    # while the main process loads the model
+    with ProcessPoolExecutor() as executor:
+        text_results = executor.map(
+            extract_text_from_file, file_paths, [INDEX_MAX_CHARS] * len(file_paths), chunksize=4
+        )
+        model = load_embedder()
+        file_texts = list(text_results)
+
+    # Each paper is indexed as several chunks; every chunk maps back to its paper via paper_id
+    texts, mapping, paper_chunks = [], {}, []
+    paper_id = 0
+
+    for fname, file_path, text in zip(fnames, file_paths, file_texts):
         # Attach metadata if available
         meta = metadata_dict.get(fname, {})
-        mapping[idx] = {
-            "file_path": file_path,
-            "text_excerpt": text_excerpt,
-            "title": meta.get("title"),
-            "abstract": meta.get("abstract"),
-            "link": meta.get("link"),
-            "published": meta.get("published"),
-        }
-        idx += 1
-
-    if not vectors:
+        chunks = split_into_token_windows(model.tokenizer, text)
+        for chunk_idx, chunk in enumerate(chunks):
+            mapping[len(texts)] = {
+                "paper_id": paper_id,
+                "chunk_index": chunk_idx,
+                "file_path": file_path,
+                "text_excerpt": chunk,
+                "title": meta.get("title"),
+                "abstract": meta.get("abstract"),
+                "link": meta.get("link"),
+                "published": meta.get("published"),
+            }
+            texts.append(chunk)
+        paper_chunks.append(chunks)
+        paper_id += 1
+
+    if not texts:
         raise ValueError("No PDFs or text files found for indexing!")
 
-    vectors = np.vstack(vectors)
-
-    dim = vectors.shape[1]
-    index = faiss.IndexFlatIP(dim)  # cosine similarity
-    index.add(vectors)
+    # Unchanged papers reuse cached vectors; the rest are embedded in one batched call
+    vectors = embed_chunks(model, paper_chunks)
+
+    # Large corpora: IVF+PQ (16 one-byte codes per vector, probed search) picks candidates,
+    # which are re-ranked against the float32 vectors so the reported scores stay exact cosines;
+    # small ones get a flat scan over int8 scalar-quantized vectors (4x less memory traffic)
+    n, dim = vectors.shape
+    if n > IVFPQ_MIN_VECTORS:
+        nlist = min(1024, n // 40)
+        quantizer = faiss.IndexFlatIP(dim)
+        ivfpq = faiss.IndexIVFPQ(quantizer, dim, nlist, 16, 8, faiss.METRIC_INNER_PRODUCT)
+        ivfpq.nprobe = 8
+        index = faiss.IndexRefineFlat(ivfpq)
+        index.k_factor = IVFPQ_REFINE_K_FACTOR
+        index.train(vectors)
+        index.add(vectors)
+    else:
+        index = faiss.IndexScalarQuantizer(
+            dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )  # cosine similarity on unit vectors
+        index.train(vectors)
+        index.add(vectors)
 
     faiss.write_index(index, index_path)
     with open(mapping_path, "w", encoding="utf-8") as f:
@@ -94,10 +199,11 @@ def build_faiss_index(pdf_dir, index_path, mapping_path, metadata_path=None):
 
     print(f"FAISS index built: {index_path}")
     print(f"Mapping saved: {mapping_path}")
-    print(f"Indexed {len(vectors)} documents")
+    print(f"Indexed {len(vectors)} chunks from {paper_id} documents")
 
 
 if __name__ == "__main__":
+    set_torch_threads()
     parser = argparse.ArgumentParser(
         description="Build FAISS index for research papers"
     )
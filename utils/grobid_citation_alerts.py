@@ -1,51 +1,68 @@
 import os
 import sys
-import json
+import orjson
 import argparse
 import requests
-import xml.etree.ElementTree as ET
+from lxml import etree
 from collections import Counter
 
 GROBID_URL = "http://localhost:8070/api/processFulltextDocument"
 
 def call_grobid(pdf_path: str, out_xml: str) -> None:
-    """Send PDF to GROBID and save XML response."""
-    with open(pdf_path, "rb") as f:
-        resp = requests.post(
-            GROBID_URL,
-            files={"input": f},
-            data={"consolidateHeader": "1", "consolidateCitations": "1"},
-            timeout=60,
-        )
-    if resp.status_code != 200:
-        raise RuntimeError(f"GROBID error {resp.status_code}: {resp.text[:200]}")
-    with open(out_xml, "w", encoding="utf-8") as outf:
-        outf.write(resp.text)
+    """Send PDF to GROBID and stream the XML response to disk."""
+    with open(pdf_path, "rb") as f, requests.post(
+        GROBID_URL,
+        files={"input": f},
+        data={"consolidateHeader": "1", "consolidateCitations": "1"},
+        timeout=60,
+        stream=True,
+    ) as resp:
+        if resp.status_code != 200:
+            raise RuntimeError(f"GROBID error {resp.status_code}: {resp.text[:200]}")
+        # Write raw bytes as they arrive; the TEI declares its own encoding
+        with open(out_xml, "wb") as outf:
+            for chunk in resp.iter_content(chunk_size=65536):
+                outf.write(chunk)
+
+
+TEI = "{http://www.tei-c.org/ns/1.0}"
+NS = {"tei": "http://www.tei-c.org/ns/1.0"}
+
+# Compiled once; each returns a (possibly empty) node list, first match in document order
+X_TITLE = etree.XPath("(.//tei:title)[1]", namespaces=NS)
+X_DATE = etree.XPath("(.//tei:date)[1]", namespaces=NS)
+X_DOI = etree.XPath("(.//tei:idno[@type='DOI'])[1]", namespaces=NS)
+X_PERSONS = etree.XPath(".//tei:author/tei:persName", namespaces=NS)
+X_SURNAME = etree.XPath("tei:surname[1]", namespaces=NS)
 
 
 def parse_references_from_xml(xml_path: str):
     """Parse GROBID TEI XML and extract structured references."""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
-    ns = {"tei": "http://www.tei-c.org/ns/1.0"}
     refs = []
 
-    for bibl in root.findall(".//tei:listBibl/tei:biblStruct", ns):
-        title_el = bibl.find(".//tei:title", ns)
-        year_el = bibl.find(".//tei:date", ns)
-        doi_el = bibl.find(".//tei:idno[@type='DOI']", ns)
-        authors = [
-            pers.find("tei:surname", ns).text if pers.find("tei:surname", ns) is not None else ""
-            for pers in bibl.findall(".//tei:author/tei:persName", ns)
-        ]
-
-        refs.append({
-            "title": title_el.text if title_el is not None else None,
-            "year": year_el.attrib.get("when") if year_el is not None else None,
-            "authors": authors,
-            "doi": doi_el.text if doi_el is not None else None
-        })
+    # Stream biblStruct elements instead of building the whole TEI tree
+    for _, bibl in etree.iterparse(xml_path, events=("end",), tag=f"{TEI}biblStruct"):
+        # Only bibliography entries; the header's biblStruct describes the paper itself
+        if bibl.getparent().tag == f"{TEI}listBibl":
+            title_el = X_TITLE(bibl)
+            year_el = X_DATE(bibl)
+            doi_el = X_DOI(bibl)
+            authors = []
+            for pers in X_PERSONS(bibl):
+                surname = X_SURNAME(pers)
+                authors.append(surname[0].text if surname else "")
+
+            refs.append({
+                "title": title_el[0].text if title_el else None,
+                "year": year_el[0].get("when") if year_el else None,
+                "authors": authors,
+                "doi": doi_el[0].text if doi_el else None
+            })
+
+        # Free the processed entry and any siblings already handled
+        bibl.clear()
+        while bibl.getprevious() is not None:
+            del bibl.getparent()[0]
 
     return refs
 
@@ -64,9 +81,12 @@ def analyze_citations(refs, year_threshold: int = 2015):
             "outdated_references": [],
         }
 
-    years = [int(r["year"]) for r in refs if r.get("year") and r["year"].isdigit()]
-    outdated = [r for r in refs if r.get("year") and r["year"].isdigit() and int(r["year"]) <= year_threshold]
-    recent = [r for r in refs if r.get("year") and r["year"].isdigit() and int(r["year"]) > year_threshold]
+    # Parse each year once and split references in a single pass
+    outdated, recent = [], []
+    for r in refs:
+        year = r.get("year")
+        if year and year.isdigit():
+            (outdated if int(year) <= year_threshold else recent).append(r)
 
     missing_dois = [r for r in refs if not r.get("doi")]
     venues = [r.get("title", "").split(":")[0] for r in refs if r.get("title")]
@@ -115,8 +135,8 @@ def main():
     }
 
     os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    with open(args.output, "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
+    with open(args.output, "wb") as f:
+        f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
 
     print(f"Report saved to {args.output}")
 
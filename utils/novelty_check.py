@@ -2,29 +2,33 @@ import argparse
 import os
 import json
 import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
 from PyPDF2 import PdfReader
+try:
+    from utils.embedder import load_embedder, set_torch_threads
+except ModuleNotFoundError:  # run as `python utils/<script>.py`, with utils/ itself on sys.path
+    from embedder import load_embedder, set_torch_threads
 
 # ---------- Config ----------
 FAISS_INDEX = "data/faiss_indexes/global_index.bin"
 FAISS_MAPPING = "data/faiss_indexes/global_mapping.json"
+CHUNK_OVERFETCH = 10  # the index stores several chunks per paper
 
 # ---------- Helpers ----------
 def extract_text_from_pdf(pdf_path, max_chars=2000):
     """Extract text from a PDF (first N chars)."""
     try:
         reader = PdfReader(pdf_path)
-        text = ""
+        text_parts, total = [], 0
         for page in reader.pages[:5]:  # only first 5 pages for speed
-            text += page.extract_text() or ""
-        return text[:max_chars]
+            t = page.extract_text() or ""
+            text_parts.append(t)
+            total += len(t)
+            if total >= max_chars:
+                break
+        return "".join(text_parts)[:max_chars]
     except Exception as e:
         return f"ERROR reading {pdf_path}: {e}"
 
-def normalize(vec: np.ndarray) -> np.ndarray:
-    return vec / np.linalg.norm(vec, axis=1, keepdims=True)
-
 def label_novelty(score: float) -> str:
     """Interpret similarity score into novelty category."""
     if score >= 0.70:
@@ -35,7 +39,7 @@ def label_novelty(score: float) -> str:
         return "Highly Novel (no strong match)"
 
 # ---------- Novelty Check ----------
-def novelty_check(input_pdf, top_k=5, output_path=None):
+def novelty_check(input_pdf, top_k=5, output_path=None, model=None):
     if not os.path.exists(FAISS_INDEX) or not os.path.exists(FAISS_MAPPING):
         raise FileNotFoundError("❌ No global FAISS index found. Please run faiss_index.py first.")
 
@@ -48,23 +52,32 @@ def novelty_check(input_pdf, top_k=5, output_path=None):
     if isinstance(mapping, list):
         mapping = {str(i): entry for i, entry in enumerate(mapping)}
 
-    # Load embedding model
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+    # Load embedding model unless the caller shares one
+    if model is None:
+        model = load_embedder()
 
     # Extract & encode query
     query_text = extract_text_from_pdf(input_pdf)
-    query_emb = model.encode([query_text], convert_to_numpy=True)
-    query_emb = normalize(query_emb)
+    query_emb = model.encode(
+        [query_text], convert_to_numpy=True, normalize_embeddings=True
+    ).astype("float32")  # faiss needs float32, the model may run in fp16
 
-    # Search in FAISS
-    D, I = index.search(query_emb, top_k)
+    # Search in FAISS; over-fetch chunks and keep only the best-scoring chunk of each paper
+    D, I = index.search(query_emb, min(index.ntotal, top_k * CHUNK_OVERFETCH))
     sims, ids = D[0], I[0]
 
     results = []
+    seen_papers = set()
     for sim, idx in zip(sims, ids):
         if idx == -1:  # no match
             continue
         entry = mapping[str(idx)]
+        paper_key = entry.get("paper_id", idx)
+        if paper_key in seen_papers:
+            continue
+        seen_papers.add(paper_key)
+        if len(results) == top_k:
+            break
         results.append({
             "similarity": float(sim),
             "novelty": label_novelty(float(sim)),
@@ -92,6 +105,7 @@ def novelty_check(input_pdf, top_k=5, output_path=None):
 
 # ---------- Entry ----------
 if __name__ == "__main__":
+    set_torch_threads()
     parser = argparse.ArgumentParser(description="Novelty Check (using FAISS global index)")
     parser.add_argument("input_pdf", help="Path to the research paper PDF")
     parser.add_argument("--top_k", type=int, default=5, help="Number of top similar papers to show")
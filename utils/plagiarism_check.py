@@ -1,61 +1,98 @@
 import os
 import json
 import argparse
+from collections import Counter, defaultdict
 import faiss
-import numpy as np
 from PyPDF2 import PdfReader
-from difflib import SequenceMatcher
-from sentence_transformers import SentenceTransformer
+try:
+    from utils.embedder import load_embedder, set_torch_threads
+except ModuleNotFoundError:  # run as `python utils/<script>.py`, with utils/ itself on sys.path
+    from embedder import load_embedder, set_torch_threads
 
-with open("data/metadata.json", "r", encoding="utf-8") as f:
-    raw_meta = json.load(f)
+FAISS_INDEX = "data/faiss_indexes/global_index.bin"
+FAISS_MAPPING = "data/faiss_indexes/global_mapping.json"
+METADATA_PATH = "data/metadata.json"
+SHINGLE_WORDS = 5
+EXACT_OVERLAP_THRESHOLD = 0.5  # share of the shorter chunk's shingles found in the other
 
-METADATA = {}
-if isinstance(raw_meta, list):
+# ---------- Utils ----------
+def load_metadata(path=METADATA_PATH):
+    """Map PDF file name -> paper metadata entry."""
+    with open(path, "r", encoding="utf-8") as f:
+        raw_meta = json.load(f)
+
+    if not isinstance(raw_meta, list):
+        return raw_meta
+    metadata = {}
     for entry in raw_meta:
         pdf_path = entry.get("pdf_path")
         if not pdf_path:   # skip None or missing
             continue
-        fname = os.path.basename(pdf_path)
-        METADATA[fname] = entry
-else:
-    METADATA = raw_meta
+        metadata[os.path.basename(pdf_path)] = entry
+    return metadata
 
-FAISS_INDEX = "data/faiss_indexes/global_index.bin"
-FAISS_MAPPING = "data/faiss_indexes/global_mapping.json"
-
-# ---------- Utils ----------
 def extract_text_from_pdf(pdf_path, max_chars=20000):
     """Extract text from a PDF."""
-    text = ""
+    text_parts, total = [], 0
     try:
         reader = PdfReader(pdf_path)
         for page in reader.pages:
-            text += page.extract_text() or ""
+            t = page.extract_text() or ""
+            text_parts.append(t)
+            total += len(t)
+            if total >= max_chars:  # later pages would be truncated away anyway
+                break
     except Exception as e:
         print(f"[ERROR] Failed to extract text from {pdf_path}: {e}")
-    return text[:max_chars].strip()
+    return "".join(text_parts)[:max_chars].strip()
+
+def word_windows(words, chunk_size=300, overlap=50):
+    """Yield overlapping windows of a word list."""
+    for i in range(0, len(words), chunk_size - overlap):
+        yield words[i:i + chunk_size]
 
 def split_into_chunks(text, chunk_size=300, overlap=50):
     """Split text into overlapping chunks (words)."""
-    words = text.split()
-    chunks = []
-    for i in range(0, len(words), chunk_size - overlap):
-        chunk = " ".join(words[i:i + chunk_size])
-        if chunk:
-            chunks.append(chunk)
-    return chunks
+    return [" ".join(w) for w in word_windows(text.split(), chunk_size, overlap)]
 
-def normalize(vec: np.ndarray) -> np.ndarray:
-    return vec / np.linalg.norm(vec, axis=1, keepdims=True)
+def shingles(words, k=SHINGLE_WORDS):
+    """Hashed k-word shingles of a chunk's words."""
+    return {hash(tuple(words[i:i + k])) for i in range(max(1, len(words) - k + 1))}
 
-def calculate_exact_overlap(chunk, ref_chunk, threshold=0.85):
-    """Exact string overlap."""
-    score = SequenceMatcher(None, chunk, ref_chunk).ratio()
+def calculate_exact_overlap(shared, size_a, size_b, threshold=EXACT_OVERLAP_THRESHOLD):
+    """Exact overlap as shingle containment: shared shingles over the smaller set."""
+    score = shared / max(1, min(size_a, size_b))
     return score if score >= threshold else None
 
+def shingle_postings(shingle_sets):
+    """Inverted index: shingle -> ids of the chunks containing it."""
+    postings = defaultdict(list)
+    for idx, sh in enumerate(shingle_sets):
+        for h in sh:
+            postings[h].append(idx)
+    return postings
+
+def exact_overlap_hits(test_shingles, test_postings, ref_shingles):
+    """
+    Return (test chunk, reference chunk, score) for every pair above the overlap threshold,
+    ordered by test chunk then reference chunk. Shared shingles are counted through the
+    inverted index, so only pairs that share at least one shingle are ever scored.
+    """
+    hits = []
+    for r_idx, r_shingles in enumerate(ref_shingles):
+        shared = Counter(t for h in r_shingles for t in test_postings.get(h, ()))
+        for t_idx, n_shared in shared.items():
+            score_exact = calculate_exact_overlap(
+                n_shared, len(test_shingles[t_idx]), len(r_shingles)
+            )
+            if score_exact:
+                hits.append((t_idx, r_idx, score_exact))
+    hits.sort()
+    return hits
+
 # ---------- Plagiarism Check ----------
-def run_plagiarism_check(test_pdf, output_file, top_k=5):
+def run_plagiarism_check(test_pdf, output_file, top_k=5, model=None):
+    metadata = load_metadata()
     print(f"[INFO] Extracting text from: {test_pdf}")
     test_text = extract_text_from_pdf(test_pdf)
     test_chunks = split_into_chunks(test_text)
@@ -71,13 +108,16 @@ def run_plagiarism_check(test_pdf, output_file, top_k=5):
     if isinstance(mapping, list):
         mapping = {str(i): entry for i, entry in enumerate(mapping)}
 
-    # Load embedding model
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+    # Load embedding model unless the caller shares one
+    if model is None:
+        model = load_embedder()
 
     # Encode test chunks
     print(f"[INFO] Encoding {len(test_chunks)} test chunks...")
-    test_embeddings = model.encode(test_chunks, convert_to_numpy=True, show_progress_bar=True)
-    test_embeddings = normalize(test_embeddings)
+    test_embeddings = model.encode(
+        test_chunks, batch_size=64, convert_to_numpy=True, normalize_embeddings=True,
+        show_progress_bar=True,
+    ).astype("float32")  # faiss needs float32, the model may run in fp16
 
     exact_matches, paraphrase_matches = [], []
 
@@ -86,15 +126,20 @@ def run_plagiarism_check(test_pdf, output_file, top_k=5):
     D, I = index.search(test_embeddings, top_k)
 
     for chunk_idx, chunk in enumerate(test_chunks):
+        matched_papers = set()  # several index chunks can belong to one paper; report it once
         for sim, ref_idx in zip(D[chunk_idx], I[chunk_idx]):
             if ref_idx == -1:
                 continue
             ref_entry = mapping[str(ref_idx)]
+            paper_key = ref_entry.get("paper_id", ref_idx)
+            if paper_key in matched_papers:
+                continue
+            matched_papers.add(paper_key)
             score = float(sim)
             if score >= 0.70:  # semantic threshold
                 
                 fname = os.path.basename(ref_entry["pdf_path"])
-                meta_entry = METADATA.get(fname, {})
+                meta_entry = metadata.get(fname, {})
                 paraphrase_matches.append({
                     "chunk": chunk,
                     "score": score,
@@ -105,27 +150,32 @@ def run_plagiarism_check(test_pdf, output_file, top_k=5):
 
     # Optional: exact overlap
     print("[INFO] Checking for exact overlaps...")
+    test_shingles = [shingles(chunk.split()) for chunk in test_chunks]
+    test_postings = shingle_postings(test_shingles)
+    seen_text_paths = set()
     for ref_idx, ref_entry in mapping.items():
         if not ref_entry.get("text_path") or not os.path.exists(ref_entry["text_path"]):
             continue
+        if ref_entry["text_path"] in seen_text_paths:  # one mapping entry per chunk
+            continue
+        seen_text_paths.add(ref_entry["text_path"])
         with open(ref_entry["text_path"], "r", encoding="utf-8") as f:
             ref_text = f.read()
-        ref_chunks = split_into_chunks(ref_text)
-
-        for chunk in test_chunks:
-            for r_chunk in ref_chunks:
-                score_exact = calculate_exact_overlap(chunk, r_chunk)
-                if score_exact:
-                    
-                    fname = os.path.basename(ref_entry["pdf_path"])
-                    meta_entry = METADATA.get(fname, {})
-                    exact_matches.append({
-                        "chunk": chunk,
-                        "score": score_exact,
-                        "pdf_name": fname,
-                        "link": meta_entry.get("link", None),
-                        "type": "exact_overlap"
-                    })
+        # Reference chunks are only shingled, so their windows are never joined into strings
+        ref_shingles = [shingles(w) for w in word_windows(ref_text.split())]
+
+        hits = exact_overlap_hits(test_shingles, test_postings, ref_shingles)
+
+        fname = os.path.basename(ref_entry["pdf_path"])
+        meta_entry = metadata.get(fname, {})
+        for t_idx, _, score_exact in hits:
+            exact_matches.append({
+                "chunk": test_chunks[t_idx],
+                "score": score_exact,
+                "pdf_name": fname,
+                "link": meta_entry.get("link", None),
+                "type": "exact_overlap"
+            })
 
     # Summary
     result = {
@@ -148,6 +198,7 @@ def run_plagiarism_check(test_pdf, output_file, top_k=5):
 
 
 if __name__ == "__main__":
+    set_torch_threads()
     parser = argparse.ArgumentParser(description="Plagiarism Check (using FAISS global index)")
     parser.add_argument("--test-pdf", type=str, required=True, help="Path to input PDF")
     parser.add_argument("--output", type=str, required=True, help="Path to save JSON results")
@@ -1,13 +1,65 @@
 import os
+import sys
+import shlex
 import argparse
 import subprocess
+import traceback
+
+# Import the stages through the `utils` package from the repo root, however this script is launched;
+# the two embedding stages run in this process so they share one loaded model
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from utils import novelty_check, plagiarism_check
+from utils.embedder import load_embedder, set_torch_threads
+
+# Stages started in the background, so a failure can stop the ones still running
+BACKGROUND = []
+
+def stop_background():
+    """Terminate and reap every background stage that is still running."""
+    for _, proc in BACKGROUND:
+        if proc.poll() is None:
+            proc.terminate()
+    for _, proc in BACKGROUND:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+def fail(message):
+    print(f"[ERROR] {message}")
+    stop_background()
+    exit(1)
 
 def run_cmd(cmd):
     print(f"\n[RUNNING] {cmd}")
     result = subprocess.run(cmd, shell=True)
     if result.returncode != 0:
+        fail(f"Command failed: {cmd}")
+
+def start_cmd(cmd, env=None):
+    print(f"\n[STARTING] {cmd}")
+    # No shell in between, so terminate() reaches the stage itself
+    proc = subprocess.Popen(shlex.split(cmd), env=env)
+    BACKGROUND.append((cmd, proc))
+    return cmd, proc
+
+def wait_cmds(procs):
+    failed = [cmd for cmd, proc in procs if proc.wait() != 0]
+    for cmd in failed[1:]:
         print(f"[ERROR] Command failed: {cmd}")
-        exit(1)
+    if failed:
+        fail(f"Command failed: {failed[0]}")
+
+def run_step(name, fn, *args, **kwargs):
+    print(f"\n[RUNNING] {name}")
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        traceback.print_exc()
+        fail(f"{name} failed: {e}")
 
 def main():
     parser = argparse.ArgumentParser(description="Full Peer Review Pipeline")
@@ -29,48 +81,60 @@ def main():
         print("Error: Provide either --pdf_url or --pdf_path")
         exit(1)
 
+    # Steps 2-5 only read the input PDF; citation and factual checks run as
+    # background processes while the embedding stages run here
     # === Step 2: Citation Analysis ===
     citation_out = os.path.join(args.out_dir, "citation_report.json")
-    run_cmd(
+    citation_proc = start_cmd(
         f"python utils/grobid_citation_alerts.py {pdf_path} --output {citation_out}"
     )
 
-    # === Step 3: Novelty Check (FAISS global index) ===
-    novelty_out = os.path.join(args.out_dir, "novelty.json")
-    run_cmd(
-        f"python utils/novelty_check.py {pdf_path} "
-        f"--top_k 5 "
-        f"--output {novelty_out}"
-    )
-
-    # === Step 4: Plagiarism Check ===
-    plagiarism_out = os.path.join(args.out_dir, "plagiarism.json")
-    run_cmd(
-        f"python utils/plagiarism_check.py "
-        f"--test-pdf {pdf_path} "
-        f"--output {plagiarism_out}"
-    )
-
     # === Step 5: Factual Check ===
     factual_out = os.path.join(args.out_dir, "factual.json")
-    run_cmd(
+    factual_proc = start_cmd(
         f"python utils/factual_check.py "
         f"--path {pdf_path} "
         f"--topic {args.topic} "
         f"--output {factual_out}"
     )
 
-    # === Step 6: Claim Mapping ===
+    # factual_check's worker pool runs alongside, so torch takes half the cores rather than all
+    torch_threads = max(1, (os.cpu_count() or 2) // 2)
+    set_torch_threads(torch_threads)
+    model = load_embedder()
+
+    # === Step 3: Novelty Check (FAISS global index) ===
+    novelty_out = os.path.join(args.out_dir, "novelty.json")
+    run_step(
+        "novelty check", novelty_check.novelty_check,
+        pdf_path, top_k=5, output_path=novelty_out, model=model
+    )
+
+    # === Step 6: Claim Mapping (needs the novelty results) ===
+    # It loads its own model while the plagiarism check runs here, so the two split torch's share
+    shared_threads = max(1, torch_threads // 2)
+    claim_env = dict(os.environ)
+    claim_env.setdefault("TORCH_THREADS", str(shared_threads))
     claim_out = os.path.join(args.out_dir, "claim_mapping.json")
-    run_cmd(
+    claim_proc = start_cmd(
         f"python utils/claim_mapping.py "
         f"--new_pdf {pdf_path} "
         f"--similar_json {novelty_out} "
         f"--claim_threshold 0.70 "
-        f"--out_dir {args.out_dir}"
+        f"--out_dir {args.out_dir}",
+        env=claim_env,
+    )
+    set_torch_threads(shared_threads)
+
+    # === Step 4: Plagiarism Check ===
+    plagiarism_out = os.path.join(args.out_dir, "plagiarism.json")
+    run_step(
+        "plagiarism check", plagiarism_check.run_plagiarism_check,
+        pdf_path, plagiarism_out, model=model
     )
 
-    # === Step 7: Review Synthesis ===
+    # === Step 7: Review Synthesis (needs every report) ===
+    wait_cmds([citation_proc, factual_proc, claim_proc])
     review_out = os.path.join(args.out_dir, "review.txt")
     run_cmd(
         f"python utils/llm_review_synthesis.py "